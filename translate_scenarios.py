@@ -1,14 +1,41 @@
-import csv
-import subprocess
 import sys
 import os
-import argparse
-import glob
 import time
-import msvcrt
 import json
+import re
+import hashlib
+import functools
+import contextlib
+import threading
+import shutil
+from array import array
+from operator import itemgetter
 from datetime import datetime
 
+try:
+    import msvcrt
+except ImportError: # POSIX terminals
+    msvcrt = None
+    import select
+    import termios
+    import tty
+
+DEFAULT_CONCURRENCY = 4
+
+# os.umask can only be read by setting it, which is process-wide;
+# do it once here, before any worker threads exist
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Written to prompts/default.txt when the file is missing
+DEFAULT_PROMPT = (
+    "You are a professional translator. Translate the following scenario text from Russian (ru) to each of these languages: {target_langs}.\n"
+    "The text is a dialogue/script for a game or story. Maintain the context, tone, and character styles.\n"
+    "For EACH language output a line '### LANG: <code>' followed by a JSON array of strings "
+    "corresponding exactly to the input lines.\n"
+    "Input:\n{text}"
+)
+
 # --- Colors & Styles ---
 class Colors:
     HEADER = '\033[95m'
@@ -25,39 +52,128 @@ class Colors:
     BG_BLUE = '\033[44m'
     BG_SELECTED = '\033[7m' # Inverse
 
-# --- Console Helper (Windows) ---
+# --- Console Helper ---
 class ConsoleInput:
-    KEY_UP = 72
-    KEY_DOWN = 80
-    KEY_LEFT = 75
-    KEY_RIGHT = 77
+    # Arrow keys use codes outside the character range so they never clash with letters
+    KEY_UP = 0x10001
+    KEY_DOWN = 0x10002
+    KEY_LEFT = 0x10003
+    KEY_RIGHT = 0x10004
     KEY_ENTER = 13
     KEY_ESC = 27
     KEY_SPACE = 32
     KEY_A = 97
     KEY_A_UPPER = 65
 
+    @staticmethod
+    def enable_vt_mode():
+        """Lets the Windows console interpret ANSI escape sequences natively."""
+        if os.name != 'nt':
+            return
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.GetStdHandle(-11) # STD_OUTPUT_HANDLE
+            mode = ctypes.c_uint32()
+            if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+                kernel32.SetConsoleMode(handle, mode.value | 0x0004) # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        except Exception:
+            pass
+
+    # Second byte after the b'\xe0' / b'\x00' prefix returned by msvcrt.getch
+    _WINDOWS_ARROWS = {72: KEY_UP, 80: KEY_DOWN, 75: KEY_LEFT, 77: KEY_RIGHT}
+    # Bytes after ESC sent by POSIX terminals (normal and application cursor mode)
+    _POSIX_ARROWS = {b'[A': KEY_UP, b'[B': KEY_DOWN, b'[D': KEY_LEFT, b'[C': KEY_RIGHT,
+                     b'OA': KEY_UP, b'OB': KEY_DOWN, b'OD': KEY_LEFT, b'OC': KEY_RIGHT}
+
     @staticmethod
     def get_key():
         """Reads a keypress and returns the key code."""
+        sys.stdout.flush() # Everything drawn so far must be visible before blocking
+        if msvcrt:
+            return ConsoleInput._get_key_windows()
+        return ConsoleInput._get_key_posix()
+
+    @staticmethod
+    def _get_key_windows():
         key = msvcrt.getch()
-        if key == b'\xe0':  # Arrow keys prefix
-            key = msvcrt.getch()
-            return ord(key)
+        if key in (b'\xe0', b'\x00'):  # Arrow/function keys prefix
+            key = ord(msvcrt.getch())
+            return ConsoleInput._WINDOWS_ARROWS.get(key, key)
+        return ord(key)
+
+    @staticmethod
+    def _get_key_posix():
+        fd = sys.stdin.fileno()
+        old_settings = termios.tcgetattr(fd)
+        try:
+            tty.setraw(fd)
+            key = os.read(fd, 1)
+            if key == b'\x1b':
+                # A lone Esc has nothing queued behind it; arrows send ESC [ X
+                if select.select([fd], [], [], 0.05)[0]:
+                    return ConsoleInput._POSIX_ARROWS.get(os.read(fd, 2), ConsoleInput.KEY_ESC)
+                return ConsoleInput.KEY_ESC
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        if key == b'\x03': # Ctrl+C is not turned into SIGINT in raw mode
+            raise KeyboardInterrupt
+        if key in (b'\r', b'\n'):
+            return ConsoleInput.KEY_ENTER
         return ord(key)
 
 # --- UI Components ---
 class TUI:
+    # Cursor home + erase to end of screen; cheaper than spawning cls/clear
+    CLEAR_SCREEN = '\033[H\033[J'
+    ANSI_PATTERN = re.compile(r'\033\[[0-9;]*[A-Za-z]') # colour codes take no screen columns
+
     def clear(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
+        sys.stdout.write(self.CLEAR_SCREEN)
+        sys.stdout.flush()
 
-    def print_header(self, title, subtitle=None):
-        self.clear()
-        print(f"{Colors.HEADER}=========================================={Colors.ENDC}")
-        print(f"   {Colors.BOLD}{title}{Colors.ENDC}")
+    def _header_lines(self, title, subtitle=None):
+        lines = [f"{Colors.HEADER}=========================================={Colors.ENDC}",
+                 f"   {Colors.BOLD}{title}{Colors.ENDC}"]
         if subtitle:
-            print(f"   {subtitle}")
-        print(f"{Colors.HEADER}=========================================={Colors.ENDC}\n")
+            lines.append(f"   {subtitle}")
+        lines.append(f"{Colors.HEADER}=========================================={Colors.ENDC}\n")
+        return lines
+
+    def _visible_width(self, line):
+        """Terminal columns a line takes: colour codes are free, wide (CJK) characters count twice."""
+        import unicodedata
+        text = self.ANSI_PATTERN.sub("", line)
+        if text.isascii():
+            return len(text)
+        return sum(2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1 for ch in text)
+
+    def _render(self, lines, previous=None):
+        """
+        Draws a frame with a single write.
+        previous: screen lines returned by the last call of the same menu; only the
+        lines that differ from it are rewritten, in place.
+        Returns: the screen lines now on display, or None when they do not map to
+        screen rows (the next frame is then drawn in full as well).
+        """
+        screen = "\n".join(lines).split("\n")
+        size = shutil.get_terminal_size()
+        wraps = (len(screen) >= size.lines
+                 or any(self._visible_width(line) >= size.columns for line in screen))
+        if previous is None or wraps:
+            # First frame, or a frame that scrolls or wraps, so rows cannot be addressed directly
+            out = self.CLEAR_SCREEN + "\n".join(screen) + "\n"
+        else:
+            parts = [f"\033[{row};1H\033[2K{line}"
+                     for row, line in enumerate(screen, 1)
+                     if row > len(previous) or line != previous[row - 1]]
+            if len(screen) < len(previous):
+                parts.append(f"\033[{len(screen) + 1};1H\033[J") # drop leftover lines
+            parts.append(f"\033[{len(screen) + 1};1H")
+            out = "".join(parts)
+        sys.stdout.write(out)
+        sys.stdout.flush()
+        return None if wraps else screen
 
     def show_menu(self, title, options, subtitle=None):
         """
@@ -66,21 +182,24 @@ class TUI:
         Returns: selected index or -1 if cancelled (Esc/Left).
         """
         current_idx = 0
+        screen = None
         while True:
-            self.print_header(title, subtitle)
+            frame = self._header_lines(title, subtitle)
             
             # Instructions
-            print(f"{Colors.BLUE}[↑/↓] Navigate   [Enter/→] Select   [Esc/←] Back{Colors.ENDC}\n")
+            frame.append(f"{Colors.BLUE}[↑/↓] Navigate   [Enter/→] Select   [Esc/←] Back{Colors.ENDC}\n")
 
             for i, option in enumerate(options):
                 label = option if isinstance(option, str) else option[0]
                 
                 if i == current_idx:
                     # Highlighted style
-                    print(f"  {Colors.CYAN}{Colors.BOLD}> {label} <{Colors.ENDC}")
+                    frame.append(f"  {Colors.CYAN}{Colors.BOLD}> {label} <{Colors.ENDC}")
                 else:
                     # Normal style
-                    print(f"    {label}")
+                    frame.append(f"    {label}")
+
+            screen = self._render(frame, screen)
 
             key = ConsoleInput.get_key()
 
@@ -106,11 +225,12 @@ class TUI:
         # Let's add a virtual option "[ SELECT ALL ]" at -1 index logic if needed, 
         # but for simplicity, we just list items.
 
+        screen = None
         while True:
-            self.print_header(title, subtitle)
+            frame = self._header_lines(title, subtitle)
             
             # Instructions
-            print(f"{Colors.BLUE}[↑/↓] Navigate   [Space] Toggle   [A] All   [Enter] Confirm   [Esc] Cancel{Colors.ENDC}\n")
+            frame.append(f"{Colors.BLUE}[↑/↓] Navigate   [Space] Toggle   [A] All   [Enter] Confirm   [Esc] Cancel{Colors.ENDC}\n")
 
             for i, option in enumerate(options):
                 is_selected = i in selected_indices
@@ -119,11 +239,12 @@ class TUI:
                 label = f"{checkbox} {option}"
                 
                 if i == current_idx:
-                    print(f"  {Colors.CYAN}{Colors.BOLD}> {label} <{Colors.ENDC}")
+                    frame.append(f"  {Colors.CYAN}{Colors.BOLD}> {label} <{Colors.ENDC}")
                 else:
-                    print(f"    {label}")
+                    frame.append(f"    {label}")
             
-            print(f"\n{Colors.BLUE}Selected: {len(selected_indices)}/{len(options)}{Colors.ENDC}")
+            frame.append(f"\n{Colors.BLUE}Selected: {len(selected_indices)}/{len(options)}{Colors.ENDC}")
+            screen = self._render(frame, screen)
 
             key = ConsoleInput.get_key()
 
@@ -160,6 +281,9 @@ class TUI:
         current_path = os.path.abspath(start_path)
         if not os.path.exists(current_path):
             current_path = os.getcwd()
+
+        # str.endswith takes a tuple, so the check runs in a single call
+        extensions = tuple(ext.lower() for ext in allowed_extensions) if allowed_extensions else None
         
         while True:
             items = []
@@ -168,21 +292,19 @@ class TUI:
             items.append((".. (Go Up)", ".."))
             
             try:
-                # List directories first
+                # List directories first; is_dir() is looked up once per entry
                 with os.scandir(current_path) as it:
-                    entries = sorted(list(it), key=lambda e: (not e.is_dir(), e.name.lower()))
-                    
-                    for entry in entries:
-                        if entry.is_dir():
-                            items.append((f"[{entry.name}]", entry.name))
-                        elif entry.is_file():
-                            if allowed_extensions:
-                                if any(entry.name.lower().endswith(ext) for ext in allowed_extensions):
-                                    items.append((entry.name, entry.name))
-                            else:
-                                items.append((entry.name, entry.name))
+                    entries = [(entry.is_dir(), entry.name.lower(), entry) for entry in it]
+                entries.sort(key=lambda t: (not t[0], t[1]))
+
+                for is_dir, lower_name, entry in entries:
+                    if is_dir:
+                        items.append((f"[{entry.name}]", entry.name))
+                    elif entry.is_file():
+                        if extensions is None or lower_name.endswith(extensions):
+                            items.append((entry.name, entry.name))
             except PermissionError:
-                print(f"{Colors.FAIL}Permission denied!{Colors.ENDC}")
+                print(f"{Colors.FAIL}Permission denied!{Colors.ENDC}", flush=True)
                 time.sleep(1)
                 return None
 
@@ -220,23 +342,26 @@ class PromptManager:
         # Ensure default prompt always exists
         default_path = os.path.join(self.prompts_dir, "default.txt")
         if not os.path.exists(default_path):
-            self.save_prompt("default", 
-                "You are a professional translator. Translate the following scenario text from Russian (ru) to {target_lang}.\n"
-                "The text is a dialogue/script for a game or story. Maintain the context, tone, and character styles.\n"
-                "Output ONLY the translated lines, one per line, corresponding exactly to the input lines.\n"
-                "Input:\n{text}"
-            )
+            self.save_prompt("default", DEFAULT_PROMPT)
 
     def list_prompts(self):
-        files = glob.glob(os.path.join(self.prompts_dir, "*.txt"))
-        return [os.path.splitext(os.path.basename(f))[0] for f in files]
+        with os.scandir(self.prompts_dir) as it:
+            return [entry.name[:-4] for entry in it if entry.name.endswith(".txt") and entry.is_file()]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _read_prompt(path, mtime_ns, size):
+        # mtime/size are part of the cache key so edited files are re-read
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
 
     def load_prompt(self, name):
         path = os.path.join(self.prompts_dir, f"{name}.txt")
-        if not os.path.exists(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
             return None
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return self._read_prompt(path, stat.st_mtime_ns, stat.st_size)
 
     def save_prompt(self, name, content):
         path = os.path.join(self.prompts_dir, f"{name}.txt")
@@ -245,117 +370,440 @@ class PromptManager:
         return path
 
 # --- Gemini Client ---
+class GeminiFatalError(Exception):
+    """A failed request that retrying cannot fix (e.g. the CLI is not installed)."""
+
 class GeminiClient:
+    def __init__(self, command=None):
+        # Resolved once and reused for every request
+        self.command = command or self._default_command()
+        # Part of the cache key: the same prompt may translate differently elsewhere
+        self.identity = "cli:" + " ".join(self.command)
+
     @staticmethod
-    def send(prompt):
+    def _default_command():
+        # cmd /c gemini.cmd bypasses PowerShell execution policy issues on Windows
+        if os.name == 'nt':
+            return ['cmd', '/c', 'gemini.cmd']
+        return ['gemini']
+
+    def send(self, prompt):
+        import subprocess
         try:
-            command = ['cmd', '/c', 'gemini.cmd']
             process = subprocess.Popen(
-                command,
+                self.command,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding='utf-8'
+                stderr=subprocess.PIPE
             )
-            stdout, stderr = process.communicate(input=prompt)
-            if process.returncode != 0:
-                err_msg = stderr if stderr else stdout
-                return None, err_msg.strip()
-            return stdout.strip(), None
+        except OSError as e:
+            # Missing or non-executable CLI
+            raise GeminiFatalError(str(e)) from e
+        try:
+            # Binary pipes: one encode/decode per request instead of text-mode wrappers
+            stdout, stderr = process.communicate(input=prompt.encode('utf-8'))
         except Exception as e:
             return None, str(e)
+        if os.name == 'nt' and process.returncode == 9009:
+            # cmd.exe: command not found
+            raise GeminiFatalError(f"'{self.command[-1]}' is not recognized as a command")
+        if process.returncode != 0:
+            err_msg = stderr if stderr else stdout
+            return None, err_msg.decode('utf-8', 'replace').strip()
+        return stdout.decode('utf-8', 'replace').strip(), None
+
+class GeminiApiClient:
+    """Sends prompts to the Gemini REST API; each worker thread keeps its own HTTPS connection."""
+    HOST = "generativelanguage.googleapis.com"
+    FATAL_STATUSES = (400, 401, 403, 404) # bad request, key or model; 429/5xx are worth retrying
+    DEFAULT_MODEL = "gemini-2.5-flash"
+
+    def __init__(self, api_key, model=DEFAULT_MODEL, timeout=300):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.identity = f"api:{model}"
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            import http.client
+            conn = http.client.HTTPSConnection(self.HOST, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def send(self, prompt):
+        body = json.dumps({"contents": [{"parts": [{"text": prompt}]}]}).encode('utf-8')
+        headers = {"Content-Type": "application/json", "x-goog-api-key": self.api_key}
+        try:
+            conn = self._connection()
+            conn.request("POST", f"/v1beta/models/{self.model}:generateContent", body, headers)
+            response = conn.getresponse()
+            payload = json.loads(response.read())
+        except Exception as e:
+            # Start over with a fresh connection on the next request
+            conn = getattr(self._local, 'conn', None)
+            if conn is not None:
+                conn.close()
+            self._local.conn = None
+            return None, str(e)
+
+        if response.status != 200:
+            error = payload.get("error", {}) if isinstance(payload, dict) else {}
+            message = error.get("message") or f"HTTP {response.status}"
+            if response.status in self.FATAL_STATUSES:
+                raise GeminiFatalError(message)
+            return None, message
+        try:
+            parts = payload["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError, TypeError):
+            return None, "Empty response"
+        text = "".join(part.get("text", "") for part in parts).strip()
+        if not text:
+            return None, "Empty response"
+        return text, None
+
+# --- Translation Cache ---
+class TranslationCache:
+    """Per-line translation memory stored in SQLite, reused across files and runs."""
+
+    DEFAULT_PATH = os.path.join(".cache", "translations.db")
+
+    def __init__(self, path=DEFAULT_PATH):
+        import sqlite3
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "context TEXT, lang TEXT, src_hash TEXT, src TEXT, dst TEXT, "
+            "PRIMARY KEY (context, lang, src_hash))"
+        )
+
+    @staticmethod
+    def _hash(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    @classmethod
+    def context_key(cls, prompt_template, glossary_terms=None, backend=""):
+        """Translations are only reused for the same prompt, glossary and backend/model."""
+        return cls._hash(json.dumps([backend, prompt_template, glossary_terms], ensure_ascii=False, sort_keys=True))
+
+    def lookup(self, context, lang, sources):
+        """Returns: dict {source: translation} for the sources already cached."""
+        by_hash = {self._hash(src): src for src in set(sources) if src}
+        hashes = list(by_hash)
+        found = {}
+        for start in range(0, len(hashes), 500): # stay under SQLite's variable limit
+            chunk = hashes[start:start+500]
+            query = (f"SELECT src_hash, src, dst FROM translations "
+                     f"WHERE context = ? AND lang = ? AND src_hash IN ({','.join('?' * len(chunk))})")
+            for src_hash, src, dst in self.conn.execute(query, [context, lang, *chunk]):
+                if by_hash[src_hash] == src and dst.strip(): # rows stored by older versions may be empty
+                    found[src] = dst
+        return found
+
+    def store(self, context, lang, pairs):
+        """Saves (source, translation) pairs in one transaction; empty translations are left out so they get requested again."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                [(context, lang, self._hash(src), src, dst) for src, dst in pairs if src and dst.strip()]
+            )
+
+    def close(self):
+        self.conn.close()
 
 # --- Translator Logic ---
 class Translator:
-    def __init__(self, prompt_manager):
+    LANG_MARKER = "### LANG:"
+    META_SUFFIX = ".meta.json" # sidecar next to each output CSV
+    PLACEHOLDER_PATTERN = re.compile(r'(\{target_langs\}|\{target_lang\}|\{glossary\}|\{text\})')
+    _JSON_DECODER = json.JSONDecoder()
+    # Failed Gemini requests are retried with exponential backoff
+    SEND_ATTEMPTS = 3
+    RETRY_DELAY = 2.0 # seconds, doubled after each failure
+    RETRY_MAX_DELAY = 30.0
+    MAX_FILES_IN_FLIGHT = 32 # files whose rows are held while their requests run
+    IO_BUFFER = 1 << 20 # bytes; whole scenario files are read and written in few syscalls
+    REDRAW_INTERVAL = 1 / 30 # frame budget for the progress bar (seconds)
+    ERASE_LINE = '\033[2K\r' # clears the progress line whatever the terminal width
+    # Per-request budget: small files are combined, long ones are split
+    BATCH_MAX_LINES = 200
+    BATCH_MAX_CHARS = 20000
+
+    # Progress bar pieces, built once and sliced per redraw
+    _FULL_BAR = '█' * 40
+    _EMPTY_BAR = '-' * 40
+    _ELAPSED_FORMAT = f" [{Colors.CYAN}{{:02d}}:{{:02d}}{Colors.ENDC}]"
+
+    def __init__(self, prompt_manager, client=None, cache=None, cache_path=TranslationCache.DEFAULT_PATH):
         self.prompt_manager = prompt_manager
+        self.client = client or GeminiClient()
+        self.cache = cache # TranslationCache; opened per run when not given
+        self.cache_path = cache_path # None disables the per-run cache
+        self._output_lock = threading.Lock()
+        self._last_draw = 0.0
+        self._held_progress = None # latest update skipped by the frame budget
+        self._last_bar_state = None
+        self._created_dirs = set() # output folders already ensured to exist
+        self._header_cache = {} # file_path -> ((mtime_ns, size), header info)
+        self._prompt_cache = {} # (template_parts, lang_codes) -> prompt parts around {text}
 
     def _print_progress(self, iteration, total, prefix='', suffix='', decimals=1, length=40, elapsed=None):
+        # Repainting is the expensive part on Windows consoles; hold back
+        # intermediate updates that come faster than the frame budget
+        now = time.monotonic()
+        if 0 < iteration < total and now - self._last_draw < self.REDRAW_INTERVAL:
+            self._held_progress = (iteration, total, prefix, suffix, decimals, length, elapsed)
+            return
+        self._held_progress = None
+        line = self._format_progress(iteration, total, prefix, suffix, decimals, length, elapsed)
+        if line is None:
+            return
+        sys.stdout.write(line)
+        sys.stdout.flush()
+        self._last_draw = now
+
+    def _flush_progress(self):
+        """Draws a held-back progress update; called before the main thread blocks."""
+        if self._held_progress:
+            line = self._format_progress(*self._held_progress)
+            self._held_progress = None
+            if line:
+                sys.stdout.write(line)
+            self._last_draw = time.monotonic()
+        sys.stdout.flush()
+
+    def _format_progress(self, iteration, total, prefix='', suffix='', decimals=1, length=40, elapsed=None):
+        """Returns the progress bar line, or None if it would look the same as the last one drawn."""
         if total == 0: total = 1
-        percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
+        percent = f"{100 * (iteration / float(total)):.{decimals}f}"
         filled_length = int(length * iteration // total)
-        bar = Colors.GREEN + '█' * filled_length + Colors.ENDC + '-' * (length - filled_length)
+        elapsed_secs = int(elapsed) if elapsed is not None else None
+
+        # Differential render: nothing visible changed since the last draw
+        state = (prefix, filled_length, percent, suffix, elapsed_secs)
+        if state == self._last_bar_state:
+            return None
+        self._last_bar_state = state
+
+        if length > len(self._FULL_BAR):
+            bar = f"{Colors.GREEN}{'█' * filled_length}{Colors.ENDC}{'-' * (length - filled_length)}"
+        else:
+            bar = f"{Colors.GREEN}{self._FULL_BAR[:filled_length]}{Colors.ENDC}{self._EMPTY_BAR[filled_length:length]}"
         
         elapsed_str = ""
-        if elapsed is not None:
-            mins, secs = divmod(int(elapsed), 60)
-            elapsed_str = f" [{Colors.CYAN}{mins:02d}:{secs:02d}{Colors.ENDC}]"
+        if elapsed_secs is not None:
+            mins, secs = divmod(elapsed_secs, 60)
+            elapsed_str = self._ELAPSED_FORMAT.format(mins, secs)
             
-        sys.stdout.write(f'\r{prefix} |{bar}| {percent}% {suffix}{elapsed_str}')
-        sys.stdout.flush()
+        return f'\r{prefix} |{bar}| {percent}% {suffix}{elapsed_str}'
 
     def _log(self, message, progress_state=None):
-        sys.stdout.write('\r' + ' ' * 120 + '\r')
-        print(message)
-        if progress_state:
-            self._print_progress(*progress_state)
+        # Worker threads log retries too; keep each message on its own line.
+        with self._output_lock:
+            self._last_bar_state = None # the bar is erased below
+            out = f"{self.ERASE_LINE}{message}\n"
+            if progress_state:
+                self._held_progress = None
+                out += self._format_progress(*progress_state)
+            # Erase, message and bar go out in one write
+            sys.stdout.write(out)
+            sys.stdout.flush()
             
-    def discover_languages(self, input_path):
-        """Scans path to find all unique target languages in CSV headers."""
-        input_path = os.path.abspath(input_path)
-        files = []
+    def _source_hash(self, sources):
+        """Fingerprint of the source column, used to tell if an output file is stale."""
+        source = json.dumps(sources, ensure_ascii=False)
+        return hashlib.blake2b(source.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _load_finished_columns(self, output_file_path, source_hash, sources, contexts):
+        """
+        Reads an existing output file whose sidecar matches source_hash.
+        contexts: {lang_code: context key}; a column only counts if it was produced
+        with the same prompt and glossary.
+        Returns: dict {lang_code: [values]} for columns with every non-empty source line translated.
+        """
+        import csv
+        try:
+            with open(output_file_path + self.META_SUFFIX, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if not isinstance(meta, dict) or meta.get('source_hash') != source_hash:
+                return {}
+            stored = meta.get('contexts') or {}
+            lang_codes = [lang_code for lang_code, context in contexts.items() if stored.get(lang_code) == context]
+            if not lang_codes:
+                return {}
+            with open(output_file_path, 'r', encoding='utf-8', newline='', buffering=self.IO_BUFFER) as f:
+                reader = csv.reader(f)
+                out_header = [h.strip() for h in next(reader)]
+                out_data = list(reader)
+        except (OSError, ValueError, AttributeError, StopIteration, csv.Error):
+            return {}
+        if len(out_data) != len(sources):
+            return {}
+
+        finished = {}
+        for lang_code in lang_codes:
+            if lang_code not in out_header:
+                continue
+            out_index = out_header.index(lang_code)
+            values = [row[out_index] if len(row) > out_index else "" for row in out_data]
+            if all(value.strip() for source, value in zip(sources, values) if source.strip()):
+                finished[lang_code] = values
+        return finished
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _atomic_open(path, **kwargs):
+        """Opens a temp file next to path for writing and moves it over path on success."""
+        import tempfile
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".part")
+        try:
+            with open(fd, 'w', encoding='utf-8', **kwargs) as f:
+                yield f
+            # mkstemp creates 0600 files; give the output the usual umask-based mode
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _save_rows(self, output_file_path, header, data, source_hash, contexts):
+        """
+        Writes a translated file and its sidecar. Returns False if saving failed.
+        contexts: {lang_code: context key} for the columns translated with the current prompt.
+        """
+        import csv
+        try:
+            output_dir = os.path.dirname(output_file_path)
+            if output_dir not in self._created_dirs:
+                os.makedirs(output_dir, exist_ok=True)
+                self._created_dirs.add(output_dir)
+            # Written to a temp file and renamed, so an interrupted run never leaves a truncated CSV
+            with self._atomic_open(output_file_path, newline='', buffering=self.IO_BUFFER) as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(data)
+            with self._atomic_open(output_file_path + self.META_SUFFIX) as f:
+                json.dump({'source_hash': source_hash, 'contexts': contexts}, f)
+            return True
+        except Exception as e:
+            self._log(f"  {Colors.FAIL}Save Error: {e}{Colors.ENDC}", None)
+            return False
+
+    def _iter_csv_files(self, path):
+        """Recursively yields .csv file paths using os.scandir (no extra stat per entry)."""
+        try:
+            it = os.scandir(path)
+        except OSError:
+            return # unreadable folders are skipped, as os.walk does
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._iter_csv_files(entry.path)
+                elif entry.is_file() and entry.name.lower().endswith('.csv'):
+                    yield entry.path
+
+    def _header_info(self, file_path):
+        """
+        Returns (ru_index, lang_codes, col_indices) for a CSV, or None if it has no 'ru' column.
+        Parsed headers are kept until the file's mtime or size changes.
+        """
+        import csv
+        try:
+            st = os.stat(file_path)
+            stamp = (st.st_mtime_ns, st.st_size)
+            cached = self._header_cache.get(file_path)
+            if cached and cached[0] == stamp:
+                return cached[1]
+
+            # Only the header row is needed here
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                header = next(csv.reader([f.readline()]), None)
+        except (OSError, UnicodeDecodeError, csv.Error):
+            return None # unreadable files are left out of discovery and the workload
+
+        info = None
+        if header and 'ru' in header:
+            ru_index = header.index('ru')
+            lang_codes = []
+            col_indices = []
+            for i in range(ru_index + 1, len(header)):
+                code = header[i].strip()
+                if code:
+                    lang_codes.append(code)
+                    col_indices.append(i)
+            info = (ru_index, tuple(lang_codes), tuple(col_indices))
+        self._header_cache[file_path] = (stamp, info)
+        return info
+
+    def prepare(self, input_path):
+        """Finds the CSV files under input_path and caches their headers for the run that follows."""
+        input_path = os.path.abspath(input_path) # same keys as process() uses
         if os.path.isfile(input_path):
             files = [input_path]
         else:
-            for root, dirs, f_list in os.walk(input_path):
-                for f in f_list:
-                    if f.lower().endswith('.csv'):
-                        files.append(os.path.join(root, f))
-        
+            files = list(self._iter_csv_files(input_path))
+        for file_path in files:
+            self._header_info(file_path)
+        return files
+
+    def discover_languages(self, input_path):
+        """Scans path to find all unique target languages in CSV headers."""
         languages = set()
-        for fpath in files:
-            try:
-                with open(fpath, 'r', encoding='utf-8', newline='') as f:
-                    reader = csv.reader(f)
-                    header = next(reader, None)
-                    if header and 'ru' in header:
-                        ru_idx = header.index('ru')
-                        for i in range(ru_idx + 1, len(header)):
-                            if header[i].strip():
-                                languages.add(header[i].strip())
-            except:
-                pass
-        return sorted(list(languages))
+        for file_path in self.prepare(input_path):
+            info = self._header_info(file_path)
+            if info:
+                languages.update(info[1])
+        return sorted(languages)
 
     def _scan_workload(self, files, target_langs=None):
         """
-        Scans headers to calculate total translation tasks.
+        Calculates total translation tasks from the (cached) headers.
         target_langs: list of strings (e.g. ['en', 'jp']). If None/Empty, all are used.
         """
         total_steps = 0
-        file_meta = [] # (file_path, target_indices_dict)
+        file_meta = [] # (file_path, lang_codes, col_indices) as parallel arrays
 
         for file_path in files:
-            try:
-                with open(file_path, 'r', encoding='utf-8', newline='') as f:
-                    header_line = f.readline()
-                    if not header_line: continue
-                    # header check passed
-                    pass
-                
-                with open(file_path, 'r', encoding='utf-8', newline='') as f:
-                    reader = csv.reader(f)
-                    header = next(reader, None)
-                    if not header or 'ru' not in header: continue
-                    
-                    ru_index = header.index('ru')
-                    targets = {}
-                    for i in range(ru_index + 1, len(header)):
-                        code = header[i].strip()
-                        if code:
-                            # Filter Logic
-                            if target_langs and code not in target_langs:
-                                continue
-                            targets[code] = i
-                    
-                    if targets:
-                        total_steps += len(targets)
-                        file_meta.append((file_path, targets))
-            except Exception:
-                continue
+            info = self._header_info(file_path)
+            if not info: continue
+
+            _, header_langs, header_cols = info
+            lang_codes = []
+            col_indices = array('i')
+            for code, i in zip(header_langs, header_cols):
+                # Filter Logic
+                if target_langs and code not in target_langs:
+                    continue
+                lang_codes.append(code)
+                col_indices.append(i)
+
+            if lang_codes:
+                total_steps += len(lang_codes)
+                file_meta.append((file_path, tuple(lang_codes), col_indices))
         return total_steps, file_meta
 
+    def _has_empty_cells(self, reader, ru_index, col_indices):
+        """
+        True as soon as a row has an empty or missing cell in one of col_indices.
+        Rows with a blank source are never translated, so they do not count.
+        """
+        for row in reader:
+            width = len(row)
+            if ru_index >= width or not row[ru_index].strip():
+                continue
+            for i in col_indices:
+                if i >= width or not row[i].strip():
+                    return True
+        return False
+
     def _load_glossary(self, glossary_path="glossary.json"):
         """Loads the whole glossary JSON."""
         if not os.path.exists(glossary_path):
@@ -367,12 +815,238 @@ class Translator:
             print(f"{Colors.WARNING}Failed to load glossary: {e}{Colors.ENDC}")
             return None
 
-    def process(self, input_path, target_langs=None, prompt_name="default", skip_existing=False):
+    def _glossary_sections(self, full_glossary):
+        """Formats the glossary block of every language once per run."""
+        sections = {}
+        if not full_glossary:
+            return sections
+        for lang_code, terms in full_glossary.items():
+            if not isinstance(terms, dict):
+                continue
+            sections[lang_code] = "".join((
+                f"\nGLOSSARY / TERMINOLOGY for {lang_code} (Mandatory):\n",
+                "".join(f"- {term} -> {translation}\n" for term, translation in terms.items()),
+                f"Please use these exact {lang_code} translations for the terms listed above.\n",
+            ))
+        return sections
+
+    def _format_glossary(self, glossary_sections, lang_codes):
+        """Builds the glossary section of the prompt for the given languages."""
+        return "".join(glossary_sections.get(lang_code, "") for lang_code in lang_codes)
+
+    def _compile_template(self, prompt_template):
+        """
+        Splits a template once into literal text and placeholders.
+        Returns: tuple where odd indices are placeholder names like '{text}'.
+        """
+        return tuple(self.PLACEHOLDER_PATTERN.split(prompt_template))
+
+    def _build_prompt(self, template_parts, lang_codes, text_block, glossary_sections):
+        """
+        Expands a compiled template for one request.
+        Everything except {text} is resolved once per language set and reused.
+        """
+        key = (template_parts, tuple(lang_codes))
+        parts = self._prompt_cache.get(key)
+        if parts is None:
+            lang_list = ", ".join(lang_codes)
+            glossary_text = self._format_glossary(glossary_sections, lang_codes)
+            values = {
+                "{target_langs}": lang_list,
+                "{target_lang}": lang_list,
+                "{glossary}": glossary_text,
+            }
+            text_prefix = ""
+            if "{glossary}" not in template_parts:
+                # Prepend glossary to text block if placeholder missing
+                text_prefix = f"{glossary_text}\nInput:\n"
+
+            # Literal runs between {text} slots; None marks where the text goes
+            parts = []
+            literal = ""
+            for i, part in enumerate(template_parts):
+                if i % 2 and part == "{text}":
+                    parts.append(literal + text_prefix)
+                    parts.append(None)
+                    literal = ""
+                else:
+                    literal += values[part] if i % 2 else part
+            parts.append(literal)
+            parts = tuple(parts)
+            self._prompt_cache[key] = parts
+        return "".join(text_block if part is None else part for part in parts)
+
+    def _parse_json_lines(self, text):
+        """Extracts a JSON array of lines from text. Returns None if there is none."""
+        start_idx = text.find('[')
+        if start_idx == -1:
+            return None
+        try:
+            # Decodes in place from the first '[' and ignores whatever follows the array
+            lines, _ = self._JSON_DECODER.raw_decode(text, start_idx)
+        except ValueError:
+            return None
+        return lines if isinstance(lines, list) else None
+
+    def _parse_response(self, response):
+        """Parses a single-language response into a list of lines."""
+        translated_lines = self._parse_json_lines(response)
+        if translated_lines is None:
+            self._log(f"  {Colors.WARNING}JSON Parse Error. Falling back to text split.{Colors.ENDC}", None)
+            translated_lines = response.split('\n')
+        return translated_lines
+
+    def _parse_multilang_response(self, response, lang_codes):
+        """
+        Splits a '### LANG: xx' delimited response, or a JSON object keyed by language.
+        Returns: dict {lang_code: [lines]} for every block that parsed.
+        """
+        result = {}
+        for block in response.split(self.LANG_MARKER)[1:]:
+            code, _, body = block.partition('\n')
+            code = code.strip()
+            if code not in lang_codes or code in result:
+                continue
+            lines = self._parse_json_lines(body)
+            if lines is not None:
+                result[code] = lines
+        if not result:
+            result = self._parse_json_object(response, lang_codes)
+        return result
+
+    def _parse_json_object(self, text, lang_codes):
+        """
+        Reads a structured answer of the form {"en": [...], "de": [...]}.
+        Returns: dict {lang_code: [lines]} for the requested languages it contains.
+        """
+        start_idx = text.find('{')
+        if start_idx == -1:
+            return {}
+        try:
+            obj, _ = self._JSON_DECODER.raw_decode(text, start_idx)
+        except ValueError:
+            return {}
+        if not isinstance(obj, dict):
+            return {}
+        return {code: obj[code] for code in lang_codes if isinstance(obj.get(code), list)}
+
+    def _send(self, prompt):
+        """client.send with exponential backoff on failed requests that may be transient."""
+        delay = self.RETRY_DELAY
+        for attempt in range(1, self.SEND_ATTEMPTS + 1):
+            try:
+                response, error = self.client.send(prompt)
+            except GeminiFatalError as e:
+                return None, str(e)
+            if response or attempt == self.SEND_ATTEMPTS:
+                return response, error
+            self._log(f"  {Colors.WARNING}Request failed ({error or 'empty response'}); retrying in {delay:.0f}s{Colors.ENDC}", None)
+            time.sleep(delay)
+            delay = min(delay * 2, self.RETRY_MAX_DELAY)
+
+    def _translate(self, template_parts, lang_codes, text_block, glossary_sections):
+        """
+        Translates text_block into every language in lang_codes.
+        Templates with {target_langs} are sent once for all languages;
+        languages missing from a batched answer are retried one by one.
+        A batched request that got no answer at all is not split up.
+        Returns: dict {lang_code: (lines or None, error)}.
+        """
+        results = {}
+        multilang = "{target_langs}" in template_parts
+        pending = list(lang_codes)
+
+        if multilang and len(pending) > 1:
+            prompt = self._build_prompt(template_parts, pending, text_block, glossary_sections)
+            response, error = self._send(prompt)
+            if not response:
+                # Already retried; single-language requests would fail the same way
+                return {lang_code: (None, error) for lang_code in pending}
+            for lang_code, lines in self._parse_multilang_response(response, pending).items():
+                results[lang_code] = (lines, None)
+            pending = [lang_code for lang_code in pending if lang_code not in results]
+            if pending:
+                self._log(f"  {Colors.WARNING}Retrying {', '.join(pending)} one by one (incomplete batched response){Colors.ENDC}", None)
+
+        for lang_code in pending:
+            prompt = self._build_prompt(template_parts, [lang_code], text_block, glossary_sections)
+            response, error = self._send(prompt)
+            if not response:
+                results[lang_code] = (None, error)
+                continue
+            lines = None
+            if multilang:
+                lines = self._parse_multilang_response(response, [lang_code]).get(lang_code)
+            if lines is None:
+                lines = self._parse_response(response)
+            results[lang_code] = (lines, None)
+        return results
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _cancel_on_error(executor):
+        """Drops queued requests when the block is left by an exception (e.g. Ctrl+C)."""
+        try:
+            yield executor
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def _submit_batch(self, executor, futures, batches, lang_key, template_parts, glossary_sections):
+        """Schedules the batch collected for lang_key as one background task."""
+        members = batches.pop(lang_key)[0]
+        blocks = [member[-1] for member in members]
+        future = executor.submit(self._translate_batch, template_parts, list(lang_key), blocks, glossary_sections)
+        futures[future] = (lang_key, members)
+
+    def _translate_batch(self, template_parts, lang_codes, blocks, glossary_sections):
+        """
+        Translates several blocks of source lines (from different files) in one request.
+        Repeated lines are sent once and answers are scattered back to every block;
+        languages whose answer does not line up are retried block by block and
+        reported as failed if it still does not.
+        Returns: list with one {lang_code: (lines or None, error)} dict per block.
+        """
+        combined = [line for block in blocks for line in block]
+        unique = list(dict.fromkeys(combined))
+        translations = self._translate(template_parts, lang_codes, "\n".join(unique), glossary_sections)
+        position = {line: i for i, line in enumerate(unique)}
+
+        results = [{} for _ in blocks]
+        retry = []
+        for lang_code in lang_codes:
+            lines, error = translations[lang_code]
+            if lines is not None and len(lines) != len(unique):
+                retry.append(lang_code)
+                continue
+            for result, block in zip(results, blocks):
+                result[lang_code] = ([lines[position[line]] for line in block] if lines is not None else None, error)
+
+        if retry:
+            how = "file by file" if len(blocks) > 1 else "once more"
+            self._log(f"  {Colors.WARNING}Line count mismatch for {', '.join(retry)}; retrying {how}{Colors.ENDC}", None)
+            for result, block in zip(results, blocks):
+                for lang_code, (lines, error) in self._translate(template_parts, retry, "\n".join(block), glossary_sections).items():
+                    if lines is not None and len(lines) != len(block):
+                        lines, error = None, f"Expected {len(block)} lines, got {len(lines)}"
+                    result[lang_code] = (lines, error)
+        return results
+
+    def process(self, input_path, target_langs=None, prompt_name="default", skip_existing=False, concurrency=DEFAULT_CONCURRENCY, force=False):
         """
         target_langs: list of strings (e.g. ['en']) or None for all.
+        concurrency: number of Gemini requests running in parallel.
+        force: re-translate everything, ignoring up-to-date output and cached lines.
         """
+        import csv
+        from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
         start_time = time.time()
         input_path = os.path.abspath(input_path)
+        self._created_dirs.clear() # folders may have been removed since the last run
+        self._last_bar_state = None
+        self._held_progress = None
+        self._prompt_cache.clear()
         
         if not os.path.exists(input_path):
             print(f"{Colors.FAIL}Path not found: {input_path}{Colors.ENDC}")
@@ -390,10 +1064,7 @@ class Translator:
         else:
             root_input_dir = input_path
             root_output_dir = f"{input_path}_translated"
-            for root, dirs, files in os.walk(input_path):
-                for file in files:
-                    if file.lower().endswith('.csv'):
-                        files_to_process.append(os.path.join(root, file))
+            files_to_process = list(self._iter_csv_files(input_path))
 
         if not files_to_process:
             print(f"{Colors.WARNING}No CSV files found.{Colors.ENDC}")
@@ -404,9 +1075,11 @@ class Translator:
         if not prompt_template:
             print(f"{Colors.FAIL}Prompt '{prompt_name}' not found!{Colors.ENDC}")
             return
+        template_parts = self._compile_template(prompt_template)
 
         # --- Load Glossary Data ---
         full_glossary = self._load_glossary()
+        glossary_sections = self._glossary_sections(full_glossary)
         start_time_str = datetime.now().strftime("%H:%M:%S")
 
         lang_display = "ALL Detected"
@@ -420,12 +1093,19 @@ class Translator:
         print(f" {Colors.BOLD}Source:{Colors.ENDC}     {input_path}")
         print(f" {Colors.BOLD}Output:{Colors.ENDC}     {root_output_dir}")
         print(f" {Colors.BOLD}Target:{Colors.ENDC}     {lang_display}")
-        print(f" {Colors.BOLD}Resume:{Colors.ENDC}     {'Yes (Skip existing)' if skip_existing else 'No (Overwrite)'}")
+        if skip_existing:
+            resume_display = "Yes (Skip existing)"
+        elif force:
+            resume_display = "No (Overwrite all)"
+        else:
+            resume_display = "No (Overwrite outdated)"
+        print(f" {Colors.BOLD}Resume:{Colors.ENDC}     {resume_display}")
+        print(f" {Colors.BOLD}Workers:{Colors.ENDC}    {concurrency}")
         if full_glossary:
              print(f" {Colors.BOLD}Glossary:{Colors.ENDC}   Loaded ({len(full_glossary)} languages defined)")
         
         # --- Pre-calculation ---
-        print(f"{Colors.CYAN}Scanning files to calculate workload...{Colors.ENDC}")
+        print(f"{Colors.CYAN}Scanning files to calculate workload...{Colors.ENDC}", flush=True)
         total_steps, workload_meta = self._scan_workload(files_to_process, target_langs)
         
         print(f" {Colors.BOLD}Files:{Colors.ENDC}      {len(files_to_process)}")
@@ -436,6 +1116,17 @@ class Translator:
             print(f"{Colors.WARNING}Nothing to translate (check headers for 'ru' and target columns).{Colors.ENDC}")
             return
 
+        # --- Translation Cache ---
+        # Still filled when forced, so later runs can reuse the fresh lines
+        cache = self.cache
+        if cache is None and self.cache_path:
+            try:
+                cache = TranslationCache(self.cache_path)
+            except Exception as e:
+                self._log(f"{Colors.WARNING}Translation cache disabled: {e}{Colors.ENDC}", None)
+        lang_contexts = {} # lang_code -> context key for this prompt + glossary + backend (cache and sidecars)
+        backend = getattr(self.client, 'identity', type(self.client).__name__)
+
         # --- Processing Loop ---
         current_step = 0
         errors = 0
@@ -443,118 +1134,236 @@ class Translator:
         # Initial Progress Bar
         self._print_progress(0, total_steps, prefix='Progress:', suffix='Starting...', length=40, elapsed=0)
 
-        for file_path, target_indices in workload_meta:
-            rel_path = os.path.relpath(file_path, root_input_dir)
-            output_file_path = os.path.join(root_output_dir, rel_path)
-            
-            # Read File Content Once
-            try:
-                with open(file_path, 'r', encoding='utf-8', newline='') as f:
-                    rows = list(csv.reader(f))
-            except Exception as e:
-                elapsed = time.time() - start_time
-                self._log(f"{Colors.FAIL}Error reading {rel_path}: {e}{Colors.ENDC}", (current_step, total_steps, 'Progress:', 'Error', 1, 40, elapsed))
-                errors += 1
-                current_step += len(target_indices) # Skip these steps
-                continue
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor, self._cancel_on_error(executor):
+            futures = {}
+            pending_groups = {} # output_file_path -> requests still running
+            batches = {} # tuple(lang_codes) -> [members, line_count, char_count]
+            changed_files = set()
+            sidecar_contexts = {} # output_file_path -> contexts of the languages that did not fail
 
-            # Identify source text
-            header = rows[0]
-            ru_index = header.index('ru') # We know it exists from scan
+            # Results are applied on this thread only, so data needs no locking.
+            def apply_result(future):
+                nonlocal current_step, errors
+                lang_codes, members = futures.pop(future)
+                try:
+                    batch_results = future.result()
+                except Exception as e:
+                    batch_results = [{lang_code: (None, str(e)) for lang_code in lang_codes} for _ in members]
+
+                for member, translations in zip(members, batch_results):
+                    rel_path, output_file_path, header, data, sources, source_hash, indices_to_process, col_indices, group, _ = member
+
+                    for lang_code, col_index in zip(lang_codes, col_indices):
+                        translated_lines, error = translations[lang_code]
+                        if translated_lines is None:
+                            group[1].setdefault(lang_code, error)
+                            sidecar_contexts[output_file_path].pop(lang_code, None) # not produced by this prompt
+                            continue
+
+                        # Fill Data
+                        cleaned = [str(line).strip() for line in translated_lines[:len(indices_to_process)]]
+                        for map_index, line in zip(indices_to_process, cleaned):
+                            data[map_index][col_index] = line
+                        changed_files.add(output_file_path)
+
+                        # Only fully aligned answers are trusted for reuse
+                        if cache and len(cleaned) == len(indices_to_process):
+                            cache.store(lang_contexts[lang_code], lang_code, [(sources[i], line) for i, line in zip(indices_to_process, cleaned)])
+
+                    # Write each file once, after its last request has returned; its rows are then released
+                    pending_groups[output_file_path] -= 1
+                    if pending_groups[output_file_path] == 0:
+                        del pending_groups[output_file_path]
+                        contexts = sidecar_contexts.pop(output_file_path)
+                        if output_file_path in changed_files:
+                            if not self._save_rows(output_file_path, header, data, source_hash, contexts):
+                                errors += 1
+
+                    # Progress and errors count once per file and language, however many chunks it took
+                    group[0] -= 1
+                    if group[0] == 0:
+                        current_step += len(lang_codes)
+                        self._log(f"[{current_step}/{total_steps}] {rel_path} -> {Colors.CYAN}{', '.join(lang_codes)}{Colors.ENDC}", None)
+                        for lang_code, error in group[1].items():
+                            self._log(f"  {Colors.FAIL}Translation Failed for {lang_code}: {error}{Colors.ENDC}", None)
+                        errors += len(group[1])
+                        elapsed = time.time() - start_time
+                        self._print_progress(current_step, total_steps, prefix='Progress:', suffix='Working...', length=40, elapsed=elapsed)
 
-            # Process per language
-            for lang_code, col_index in target_indices.items():
-                elapsed = time.time() - start_time
-                self._log(f"[{current_step+1}/{total_steps}] {rel_path} -> {Colors.CYAN}{lang_code}{Colors.ENDC}", 
-                          (current_step, total_steps, 'Progress:', f'{lang_code}...', 1, 40, elapsed))
+
+            for file_path, file_langs, file_cols in workload_meta:
+                rel_path = os.path.relpath(file_path, root_input_dir)
+                output_file_path = os.path.join(root_output_dir, rel_path)
                 
+                # Read File Content Once (header kept apart from the data rows)
+                try:
+                    with open(file_path, 'r', encoding='utf-8', newline='', buffering=self.IO_BUFFER) as f:
+                        reader = csv.reader(f)
+                        header = next(reader)
+                        if skip_existing:
+                            # Files with every target cell filled are not materialised at all
+                            if not self._has_empty_cells(reader, header.index('ru'), file_cols):
+                                data = None
+                            else:
+                                f.seek(0)
+                                reader = csv.reader(f)
+                                next(reader)
+                                data = list(reader)
+                        else:
+                            data = list(reader)
+                except Exception as e:
+                    elapsed = time.time() - start_time
+                    self._log(f"{Colors.FAIL}Error reading {rel_path}: {e}{Colors.ENDC}", (current_step, total_steps, 'Progress:', 'Error', 1, 40, elapsed))
+                    errors += 1
+                    current_step += len(file_langs) # Skip these steps
+                    continue
+
+                if data is None:
+                    current_step += len(file_langs)
+                    self._log(f"[{current_step}/{total_steps}] {rel_path} -> {Colors.CYAN}{', '.join(file_langs)}{Colors.ENDC} {Colors.GREEN}Skipped (Already translated){Colors.ENDC}", None)
+                    elapsed = time.time() - start_time
+                    self._print_progress(current_step, total_steps, prefix='Progress:', suffix='Skipped', length=40, elapsed=elapsed)
+                    continue
+
+                # Identify source text
+                ru_index = header.index('ru') # We know it exists from scan
+
+                # Right-pad short rows once so every column can be indexed directly
+                width = max(len(header), max(file_cols) + 1)
+                for row in data:
+                    if len(row) < width:
+                        row.extend([""] * (width - len(row)))
+
+                # Source column extracted once and shared by every language of the file
+                sources = list(map(itemgetter(ru_index), data))
+
+                # Languages already complete in an up-to-date output file
+                source_hash = self._source_hash(sources)
+                for lang_code in file_langs:
+                    if lang_code not in lang_contexts:
+                        terms = full_glossary.get(lang_code) if full_glossary else None
+                        lang_contexts[lang_code] = TranslationCache.context_key(prompt_template, terms, backend)
+                file_contexts = {lang_code: lang_contexts[lang_code] for lang_code in file_langs}
+                finished = {} if force else self._load_finished_columns(output_file_path, source_hash, sources, file_contexts)
+
+                # Rows with an empty source keep an empty translation and are never sent
+                blank_rows = {i for i, source in enumerate(sources) if not source.strip()}
+
                 # --- Filter for Resume Mode ---
-                indices_to_process = []
-                source_subset = []
-                
-                if skip_existing:
-                    for i in range(1, len(rows)):
-                        row = rows[i]
-                        # Check if translation exists
-                        has_translation = len(row) > col_index and row[col_index].strip() != ""
-                        if not has_translation:
-                            indices_to_process.append(i)
-                            source_subset.append(row[ru_index] if len(row) > ru_index else "")
-                    
+                # Languages that need the same set of rows share one Gemini call.
+                groups = {}
+                for lang_code, col_index in zip(file_langs, file_cols):
+                    if lang_code in finished:
+                        # Keep the finished column in case the file is rewritten for other languages
+                        for row, value in zip(data, finished[lang_code]):
+                            row[col_index] = value
+                        self._log(f"[{current_step+1}/{total_steps}] {rel_path} -> {Colors.CYAN}{lang_code}{Colors.ENDC} {Colors.GREEN}Skipped (Output up to date){Colors.ENDC}", None)
+                        current_step += 1
+                        elapsed = time.time() - start_time
+                        self._print_progress(current_step, total_steps, prefix='Progress:', suffix='Skipped', length=40, elapsed=elapsed)
+                        continue
+
+                    if skip_existing:
+                        indices_to_process = tuple(
+                            i for i, row in enumerate(data)
+                            if not row[col_index].strip()
+                        )
+                    else:
+                        # Process All
+                        indices_to_process = tuple(range(len(data)))
+
+                    if blank_rows:
+                        kept = []
+                        for i in indices_to_process:
+                            if i not in blank_rows:
+                                kept.append(i)
+                            elif data[i][col_index]:
+                                data[i][col_index] = ""
+                                changed_files.add(output_file_path)
+                        indices_to_process = tuple(kept)
+
+                    # Serve lines translated in earlier runs from the local cache
+                    if cache and indices_to_process and not force:
+                        cached = cache.lookup(lang_contexts[lang_code], lang_code, [sources[i] for i in indices_to_process])
+                        remaining = []
+                        for i in indices_to_process:
+                            source = sources[i]
+                            if source in cached:
+                                data[i][col_index] = cached[source]
+                            else:
+                                remaining.append(i)
+                        if len(remaining) < len(indices_to_process):
+                            changed_files.add(output_file_path)
+                        if not remaining:
+                            self._log(f"[{current_step+1}/{total_steps}] {rel_path} -> {Colors.CYAN}{lang_code}{Colors.ENDC} {Colors.GREEN}Served from cache{Colors.ENDC}", None)
+                            current_step += 1
+                            elapsed = time.time() - start_time
+                            self._print_progress(current_step, total_steps, prefix='Progress:', suffix='Cached', length=40, elapsed=elapsed)
+                            continue
+                        indices_to_process = tuple(remaining)
+
                     if not indices_to_process:
-                        self._log(f"  {Colors.GREEN}Skipped (Already translated){Colors.ENDC}", None)
+                        self._log(f"[{current_step+1}/{total_steps}] {rel_path} -> {Colors.CYAN}{lang_code}{Colors.ENDC} {Colors.GREEN}Skipped (Already translated){Colors.ENDC}", None)
                         current_step += 1
                         elapsed = time.time() - start_time
                         self._print_progress(current_step, total_steps, prefix='Progress:', suffix='Skipped', length=40, elapsed=elapsed)
                         continue
-                else:
-                    # Process All
-                    indices_to_process = list(range(1, len(rows)))
-                    source_subset = [r[ru_index] if len(r) > ru_index else "" for r in rows[1:]]
-
-                # Prepare Glossary for THIS specific language
-                glossary_text = ""
-                if full_glossary and lang_code in full_glossary:
-                    glossary_text = "\nGLOSSARY / TERMINOLOGY (Mandatory):\n"
-                    for term, translation in full_glossary[lang_code].items():
-                        glossary_text += f"- {term} -> {translation}\n"
-                    glossary_text += f"Please use these exact {lang_code} translations for the terms listed above.\n"
-
-                # Format Prompt
-                text_block = "\n".join(source_subset)
-                
-                # Inject glossary if present
-                final_prompt = prompt_template.replace("{target_lang}", lang_code)
-                if "{glossary}" in final_prompt:
-                     final_prompt = final_prompt.replace("{glossary}", glossary_text)
-                else:
-                    # Prepend glossary to text block if placeholder missing
-                    final_prompt = final_prompt.replace("{text}", f"{glossary_text}\nInput:\n{text_block}")
-                
-                # Send Request
-                response, error = GeminiClient.send(final_prompt)
-
-                if response:
-                    translated_lines = []
-                    # Try JSON parsing first
-                    try:
-                        import json
-                        # Find potential JSON array
-                        start_idx = response.find('[')
-                        end_idx = response.rfind(']')
-                        if start_idx != -1 and end_idx != -1:
-                            json_str = response[start_idx:end_idx+1]
-                            translated_lines = json.loads(json_str)
-                        else:
-                            # Fallback to splitting if no brackets found
-                            translated_lines = response.split('\\n')
-                    except Exception as e:
-                        self._log(f"  {Colors.WARNING}JSON Parse Error: {e}. Falling back to text split.{Colors.ENDC}", None)
-                        translated_lines = response.split('\\n')
-
-                    # Fill Data
-                    for idx, map_index in enumerate(indices_to_process):
-                        if idx < len(translated_lines):
-                            target_row = rows[map_index]
-                            while len(target_row) <= col_index: target_row.append("")
-                            target_row[col_index] = str(translated_lines[idx]).strip()
-                    
-                    # INCREMENTAL SAVE
-                    try:
-                        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-                        with open(output_file_path, 'w', encoding='utf-8', newline='') as f:
-                            csv.writer(f).writerows(rows)
-                    except Exception as e:
-                        self._log(f"  {Colors.FAIL}Save Error: {e}{Colors.ENDC}", None)
+                    group_langs, group_cols = groups.setdefault(indices_to_process, ([], []))
+                    group_langs.append(lang_code)
+                    group_cols.append(col_index)
+
+                # Long files are cut into chunks that run as separate requests;
+                # chunks of one group share its progress state
+                chunks = []
+                for indices_to_process, (lang_codes, col_indices) in groups.items():
+                    starts = range(0, len(indices_to_process), self.BATCH_MAX_LINES)
+                    group = [len(starts), {}] # chunks still running, {lang_code: first error}
+                    for start in starts:
+                        chunks.append((indices_to_process[start:start+self.BATCH_MAX_LINES], lang_codes, col_indices, group))
+                if chunks:
+                    pending_groups[output_file_path] = len(chunks)
+                    sidecar_contexts[output_file_path] = file_contexts
+                elif output_file_path in changed_files:
+                    # Everything came from the cache; nothing left to wait for
+                    if not self._save_rows(output_file_path, header, data, source_hash, file_contexts):
                         errors += 1
 
-                else:
-                    self._log(f"  {Colors.FAIL}Translation Failed for {lang_code}: {error}{Colors.ENDC}", None)
-                    errors += 1
-                
-                current_step += 1
-                elapsed = time.time() - start_time
-                self._print_progress(current_step, total_steps, prefix='Progress:', suffix='Working...', length=40, elapsed=elapsed)
+                # Small request groups from several files with the same languages share one call
+                for indices_to_process, lang_codes, col_indices, group in chunks:
+                    source_subset = [sources[i] for i in indices_to_process]
+                    lang_key = tuple(lang_codes)
+                    size = sum(len(line) for line in source_subset)
+                    batch = batches.get(lang_key)
+                    if batch and (batch[1] + len(source_subset) > self.BATCH_MAX_LINES or batch[2] + size > self.BATCH_MAX_CHARS):
+                        self._submit_batch(executor, futures, batches, lang_key, template_parts, glossary_sections)
+                    batch = batches.setdefault(lang_key, [[], 0, 0])
+                    batch[0].append((rel_path, output_file_path, header, data, sources, source_hash, indices_to_process, col_indices, group, source_subset))
+                    batch[1] += len(source_subset)
+                    batch[2] += size
+
+                # Keep at most MAX_FILES_IN_FLIGHT files' rows in memory: send what is
+                # queued and apply results until enough files have been written
+                if len(pending_groups) >= self.MAX_FILES_IN_FLIGHT:
+                    for lang_key in list(batches):
+                        self._submit_batch(executor, futures, batches, lang_key, template_parts, glossary_sections)
+                    while len(pending_groups) >= self.MAX_FILES_IN_FLIGHT:
+                        self._flush_progress()
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            apply_result(future)
+
+            for lang_key in list(batches):
+                self._submit_batch(executor, futures, batches, lang_key, template_parts, glossary_sections)
+
+            self._flush_progress()
+
+            for future in as_completed(list(futures)):
+                apply_result(future)
+                # The next result may take a while; show where we are
+                self._flush_progress()
+
+        if cache and cache is not self.cache:
+            cache.close()
 
         # --- Final Report ---
         elapsed = time.time() - start_time
@@ -590,7 +1399,7 @@ class AppCLI:
                 self.tui.clear()
                 print(f"{Colors.HEADER}--- Create New Prompt ---{Colors.ENDC}")
                 name = self.tui.input_text("Enter prompt name (no spaces)")
-                print("\nEnter prompt text (Use {target_lang} and {text} placeholders).")
+                print("\nEnter prompt text (Use {target_lang} or {target_langs} and {text} placeholders).")
                 print("Type 'END' on a new line to finish:")
                 lines = []
                 while True:
@@ -604,7 +1413,7 @@ class AppCLI:
                 print(f"{Colors.CYAN}--- Content of '{selected}' ---{Colors.ENDC}")
                 print(self.prompt_manager.load_prompt(selected))
                 print(f"\n{Colors.BLUE}Press any key to return...{Colors.ENDC}")
-                msvcrt.getch()
+                ConsoleInput.get_key()
 
     def run(self):
         while True:
@@ -635,7 +1444,7 @@ class AppCLI:
                 # 2. Select Prompt
                 prompts = self.prompt_manager.list_prompts()
                 if not prompts:
-                    print("No prompts found!")
+                    print("No prompts found!", flush=True)
                     time.sleep(2)
                     continue
                     
@@ -645,7 +1454,7 @@ class AppCLI:
 
                 # 3. Select Language (MULTI-SELECT)
                 self.tui.clear()
-                print(f"{Colors.CYAN}Scanning for available languages...{Colors.ENDC}")
+                print(f"{Colors.CYAN}Scanning for available languages...{Colors.ENDC}", flush=True)
                 available_langs = self.translator.discover_languages(path)
                 
                 selected_langs = None
@@ -656,7 +1465,7 @@ class AppCLI:
                      if manual: selected_langs = [manual]
                 else:
                     # Show Multi-select
-                    print(f"{Colors.GREEN}Found {len(available_langs)} languages.{Colors.ENDC}")
+                    print(f"{Colors.GREEN}Found {len(available_langs)} languages.{Colors.ENDC}", flush=True)
                     time.sleep(0.5)
                     selected_langs = self.tui.multiselect_menu("Select Target Languages", available_langs, subtitle="Space to toggle, Enter to confirm")
                 
@@ -669,26 +1478,45 @@ class AppCLI:
                 skip_existing = resume_input.lower().startswith('y')
 
                 # Run
-                self.translator.process(path, selected_langs, selected_prompt, skip_existing)
+                self.translator.process(path, selected_langs, selected_prompt, skip_existing, force=not skip_existing)
                 
                 print(f"\n{Colors.BLUE}Press any key to continue...{Colors.ENDC}")
-                msvcrt.getch()
+                ConsoleInput.get_key()
 
 def main():
+    ConsoleInput.enable_vt_mode()
+    # Block-buffer stdout; the TUI and progress bar flush at their own boundaries
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(line_buffering=False, write_through=False)
     if len(sys.argv) > 1:
         # Legacy Headless Mode
+        import argparse
         parser = argparse.ArgumentParser(description='Translate scenario CSV files.')
         parser.add_argument('input_path', nargs='?', default='scenarios', help='Path to input')
         parser.add_argument('--lang', type=str, help='Specific target language')
         parser.add_argument('--prompt', type=str, default='default', help='Prompt template name')
         parser.add_argument('--resume', action='store_true', help='Skip already translated lines')
+        parser.add_argument('--force', action='store_true', help='Re-translate languages already complete in the output')
+        parser.add_argument('--concurrency', '--jobs', type=int, default=DEFAULT_CONCURRENCY, help='Number of parallel Gemini requests')
+        parser.add_argument('--cache-path', type=str, default=TranslationCache.DEFAULT_PATH, help='Translation cache database')
+        parser.add_argument('--no-cache', action='store_true', help='Do not read or write the translation cache')
+        parser.add_argument('--api', action='store_true', help='Call the Gemini API directly (needs GEMINI_API_KEY) instead of the CLI')
+        parser.add_argument('--model', type=str, default=GeminiApiClient.DEFAULT_MODEL, help='Model used with --api')
         args = parser.parse_args()
+
+        client = None
+        if args.api:
+            api_key = os.environ.get('GEMINI_API_KEY')
+            if not api_key:
+                parser.error("--api requires the GEMINI_API_KEY environment variable")
+            client = GeminiApiClient(api_key, args.model)
         
         pm = PromptManager()
         # Wrap single lang arg in list if present
         langs = [args.lang] if args.lang else None
         
-        Translator(pm).process(args.input_path, langs, args.prompt, args.resume)
+        cache_path = None if args.no_cache else args.cache_path
+        Translator(pm, client=client, cache_path=cache_path).process(args.input_path, langs, args.prompt, args.resume, args.concurrency, args.force)
     else:
         AppCLI().run()
 